@@ -0,0 +1,74 @@
+#
+#  Copyright (c) 2018 Two Sigma Open Source, LLC
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to
+#  deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+#  FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+#  IN THE SOFTWARE.
+#
+
+
+'''Formats the notes test authors annotate assertions with.
+
+Both :mod:`marbles.core.marbles` and :mod:`marbles.core.log` format
+notes, and :mod:`marbles.core.marbles` imports :mod:`marbles.core.log`,
+so this lives in its own module that both can import.
+'''
+
+import collections.abc
+import textwrap
+
+
+class AnnotationError(Exception):
+    '''Raised when there is a problem with the way an assertion was
+    annotated.
+    '''
+    pass
+
+
+class _Locals(collections.abc.Mapping):
+    '''Locals to format a note with, which explains what went wrong if
+    the note refers to a variable that isn't defined in the test.
+
+    This only wraps ``locals_``, rather than copying it, because tests
+    can have a lot of locals and a note usually only uses a few.
+    '''
+
+    def __init__(self, locals_):
+        self._locals = locals_
+
+    def __getitem__(self, key):
+        try:
+            return self._locals[key]
+        except KeyError:
+            raise AnnotationError(
+                'Note refers to undefined local variable: {0!r}'.format(
+                    key)) from None
+
+    def __iter__(self):
+        return iter(self._locals)
+
+    def __len__(self):
+        return len(self._locals)
+
+
+def format_note(note, locals_):
+    '''Dedents ``note`` and formats it with the test's ``locals_``.
+
+    Raises :class:`AnnotationError` if ``note`` refers to a local
+    variable that isn't defined.
+    '''
+    return textwrap.dedent(note).format_map(_Locals(locals_))
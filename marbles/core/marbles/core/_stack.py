@@ -21,7 +21,6 @@
 #
 
 import sys
-import traceback
 
 
 def get_stack_info():
@@ -29,7 +28,12 @@ def get_stack_info():
     stacktrace to provide the source of the assertion error and
     formatted note.
     '''
-    stack = traceback.walk_stack(sys._getframe().f_back)
+    # We walk the frames ourselves rather than using
+    # traceback.walk_stack, which is a generator whose behavior
+    # around the starting frame has varied between Python versions.
+    # We start at our caller and stop at the first test frame, so the
+    # test runner's frames further out are never looked at.
+    frame = sys._getframe(1)
 
     # We want locals from the test definition (which always begins
     # with 'test_' in unittest), which will be at a different
@@ -38,8 +42,9 @@ def get_stack_info():
 
     # The branch where we exhaust this loop is not covered
     # because we always find a test.
-    for frame, _ in stack:  # pragma: no branch
+    while frame is not None:  # pragma: no branch
         code = frame.f_code
         if code.co_name.startswith('test_'):
             return (frame.f_locals.copy(), frame.f_globals['__name__'],
                     code.co_filename, frame.f_lineno)
+        frame = frame.f_back
@@ -51,6 +51,7 @@ import inspect
 import json
 import os
 
+from . import _annotation
 from . import _stack
 from . import __version__
 
@@ -241,7 +242,7 @@ class AssertionLogger(object):
 
         verbose_elements = {
             'msg': msg,
-            'note': note.format(**locals_) if note else None,
+            'note': _annotation.format_note(note, locals_) if note else None,
             'locals': [{'key': k, 'value': str(v)} for k, v in locals_.items()
                        if (k not in ('msg', 'note', 'self')
                            and not k.startswith('_'))]
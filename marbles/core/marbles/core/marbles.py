@@ -51,19 +51,23 @@ will produce a :class:`marbles.core.AnnotationError`.
 '''
 
 import ast
+import bisect
 import collections.abc
 import functools
 import inspect
 import itertools
 import linecache
 import logging
+import os
 import re
 import sys
 import textwrap
 import unittest
 
 from . import log
+from . import _annotation
 from . import _stack
+from ._annotation import AnnotationError
 
 
 _log = logging.getLogger(__name__)
@@ -74,6 +78,9 @@ _log = logging.getLogger(__name__)
 # return the note as a wrapped string.
 class _NoteWrapper(textwrap.TextWrapper):
 
+    _pilcrow = re.compile(r'(\n\s*\n)', re.MULTILINE)
+    _list_prefix = re.compile(r'\s*(?:\w|[0-9]+)[\.\)]\s+')
+
     def wrap(self, text, **kwargs):
         '''Wraps each paragraph in ``text`` individually.
 
@@ -86,17 +93,22 @@ class _NoteWrapper(textwrap.TextWrapper):
         str
             Single string containing the wrapped paragraphs.
         '''
-        pilcrow = re.compile(r'(\n\s*\n)', re.MULTILINE)
-        list_prefix = re.compile(r'\s*(?:\w|[0-9]+)[\.\)]\s+')
-
-        paragraphs = pilcrow.split(text)
+        # Most notes are a single short line, which wrapping wouldn't
+        # change, and wrapping isn't cheap. Any whitespace other than
+        # single spaces inside the line would be changed by wrapping,
+        # so in that case we still do it.
+        if (text and text.isprintable() and text == text.strip() and
+                len(self.initial_indent) + len(text) <= self.width):
+            return [self.initial_indent + text]
+
+        paragraphs = self._pilcrow.split(text)
         wrapped_lines = []
         for paragraph in paragraphs:
             if paragraph.isspace():
                 wrapped_lines.append('')
             else:
                 wrapper = textwrap.TextWrapper(**vars(self))
-                list_item = re.match(list_prefix, paragraph)
+                list_item = re.match(self._list_prefix, paragraph)
                 if list_item:
                     wrapper.subsequent_indent += ' ' * len(list_item.group(0))
                 wrapped_lines.extend(wrapper.wrap(paragraph))
@@ -104,13 +116,20 @@ class _NoteWrapper(textwrap.TextWrapper):
         return wrapped_lines
 
 
-class _StatementFinder(ast.NodeVisitor):
+class _StatementIndex(object):
     '''Finds the line of the statement containing a target line.
 
+    We keep the line span of every statement, sorted by the line they
+    start on, along with the index of each one's innermost enclosing
+    statement. To find the statement containing a line, we bisect for
+    the last statement starting on or before it, and then walk out to
+    its ancestors until we find one that hasn't ended before that line.
+
+    For this, we need the statements in depth-first order (so that
+    they come out sorted and each one comes after its ancestors).
     For reasons passing understanding, :meth:`ast.walk` traverses the
-    tree in breadth-first order rather than depth-first. In order to
-    traverse depth-first (which we want), you have to implement a
-    :class:`ast.NodeVisitor`.
+    tree in breadth-first order rather than depth-first, so we
+    traverse it ourselves.
 
     Startlingly, :meth:`ast.walk`'s documentation says that it
     traverses "in no particular order". While I respect the decision
@@ -118,49 +137,183 @@ class _StatementFinder(ast.NodeVisitor):
     might change in the future, to claim that it traverses "in no
     particular order" is simply a lie.
 
-    In any case, this visitor will traverse the tree, and when it finds
-    a node on the target line, it sets ``self.found`` to the line
-    number of the innermost ancestor which is a Statement.
-
     Example::
 
-        finder = _StatementFinder(target_linenumber)
-        finder.visit(tree)
-        containing_statement_linenumber = finder.found
+        index = _StatementIndex(tree)
+        containing_statement_linenumber = index.find(target_linenumber)
     '''
 
-    def __init__(self, target):
-        self.target = target
-        self.stack = []
-        self.found = None
-
-    @property
-    def current_stmt(self):
-        return self.stack[-1]
-
-    def visit(self, node):
-        lineno = getattr(node, 'lineno', None)
-        if lineno == self.target and self.found is None:
-            if isinstance(node, ast.stmt):
-                self.found = node.lineno
+    # Lines starting any clause of a compound statement but its first
+    _CLAUSE = re.compile(r'\s*(?:elif|else|except|finally)\b')
+
+    def __init__(self, tree, lines=None):
+        self.starts = []
+        self.ends = []
+        self.parents = []
+        self._stack = []
+        self._lines = lines
+        # For statements without end_lineno, the index of the first
+        # statement after them (and everything inside them)
+        self._following = {}
+        # For statements without end_lineno, the lines their clauses
+        # after the first start on
+        self._clauses = []
+        self._visit(tree)
+        self._clauses.sort()
+
+        # Before Python 3.8, nodes don't have end_lineno, and the last
+        # line any node inside a statement starts on misses lines like
+        # a closing paren on its own. A statement really ends just
+        # before the next statement that isn't inside it starts, or
+        # the next clause of a statement it's inside (e.g., the last
+        # statement in a try: block ends before the except: line), or
+        # at the end of the source, if there's neither.
+        nlines = len(lines) if lines is not None else None
+        for idx, following in self._following.items():
+            if following < len(self.starts):
+                end = self.starts[following] - 1
             else:
-                self.found = self.current_stmt.lineno
-
+                end = nlines or self.ends[idx]
+            clause = bisect.bisect_right(self._clauses, self.ends[idx])
+            if clause < len(self._clauses):
+                end = min(end, self._clauses[clause] - 1)
+            self.ends[idx] = max(self.ends[idx], end)
+        self._lines = None
+
+    def _visit(self, node):
+        '''Indexes the statements under ``node``, returning the last
+        line ``node`` spans, as far as we can tell from the tree.
+        '''
+        end_lineno = getattr(node, 'end_lineno', None)
+        last = end_lineno or getattr(node, 'lineno', 0)
         if isinstance(node, ast.stmt):
-            self.stack.append(node)
+            idx = len(self.starts)
+            self.starts.append(node.lineno)
+            self.ends.append(None)
+            self.parents.append(self._stack[-1] if self._stack else -1)
+            self._stack.append(idx)
+            # The first statements of the else: and finally: clauses
+            clause_bodies = [
+                body[0] for body in (getattr(node, 'orelse', None),
+                                     getattr(node, 'finalbody', None))
+                if body and end_lineno is None]
             try:
-                self.generic_visit(node)
+                for child in ast.iter_child_nodes(node):
+                    if end_lineno is None:
+                        if isinstance(child, ast.ExceptHandler):
+                            self._clauses.append(child.lineno)
+                        elif any(child is body for body in clause_bodies):
+                            self._clauses.append(
+                                self._clause_start(last + 1, child.lineno))
+                    last = max(last, self._visit(child))
             finally:
-                self.stack.pop()
+                self._stack.pop()
+            self.ends[idx] = last
+            if end_lineno is None:
+                self._following[idx] = len(self.starts)
         else:
-            self.generic_visit(node)
+            for child in ast.iter_child_nodes(node):
+                last = max(last, self._visit(child))
+        return last
+
+    def _clause_start(self, first, lineno):
+        '''Returns the line an else: or finally: clause starts on,
+        given that its first statement starts on ``lineno``, and the
+        clause before it doesn't end before ``first``.
+
+        The tree doesn't tell us, but only blank lines and comments
+        can come between the two, so the nearest clause keyword before
+        the statement is the one.
+        '''
+        if self._lines is not None:
+            for clause in range(lineno, first - 1, -1):
+                if self._CLAUSE.match(self._lines[clause - 1]):
+                    return clause
+        return lineno
+
+    def find(self, linenumber):
+        idx = bisect.bisect_right(self.starts, linenumber) - 1
+        while idx >= 0 and self.ends[idx] < linenumber:
+            idx = self.parents[idx]
+        if idx < 0:
+            return None
+        return self.starts[idx]
+
+
+class _SourceFile(object):
+    '''The lines of a source file, and the statements in it.
+
+    The lines are :mod:`linecache`'s own list, not a copy. When a test
+    fails, :mod:`unittest` formats the traceback with
+    :mod:`linecache`, which loads the test module's file anyway, so
+    this way we don't keep a second copy of it. The file is parsed at
+    most once, and only the statements' line spans are kept.
+    '''
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._statements = None
+
+    @property
+    def statements(self):
+        '''A :class:`_StatementIndex` of the file.'''
+        if self._statements is None:
+            self._statements = _StatementIndex(
+                ast.parse(''.join(self.lines)), self.lines)
+        return self._statements
+
+    def find_statement(self, linenumber):
+        '''Returns the line number of the statement containing
+        ``linenumber``, or ``None`` if we can't tell.
+        '''
+        return self.statements.find(linenumber)
+
+    def getline(self, lineno):
+        '''Like :func:`linecache.getline`, returns ``''`` for lines
+        that aren't in the file.
+        '''
+        if not 1 <= lineno <= len(self.lines):
+            return ''
+        return self.lines[lineno - 1]
+
 
+@functools.lru_cache(maxsize=64)
+def _source_file(filename, mtime):
+    '''Caches a :class:`_SourceFile` for each file.
 
-class AnnotationError(Exception):
-    '''Raised when there is a problem with the way an assertion was
-    annotated.
+    Test modules usually fail more than once (think parametrized
+    tests), so we only want to parse each of them once. ``mtime`` is
+    only part of the cache key, so that we notice if the file changes.
+    '''
+    # linecache doesn't notice that a file changed unless we ask it to
+    linecache.checkcache(filename)
+    lines = linecache.getlines(filename)
+    if not lines:
+        raise OSError('Could not read source file: {0!r}'.format(filename))
+    return _SourceFile(lines)
+
+
+def _load_source(filename, module_globals=None):
+    '''Returns the :class:`_SourceFile` for ``filename``.
+
+    Everything we show about one failure should come from the same
+    version of the file, so callers should load it once and use the
+    result throughout.
+
+    We may need the ``module_globals`` in order to tell
+    :mod:`linecache` how to find the file, if it isn't on disk (it's
+    probably inside an egg). In that case, ``module_globals`` should
+    contain a key ``__loader__`` which knows how to read from that
+    file.
     '''
-    pass
+    if module_globals is not None:
+        linecache.lazycache(filename, module_globals)
+    try:
+        mtime = os.path.getmtime(filename)
+    except OSError:
+        # Files that aren't on disk don't change
+        mtime = None
+    return _source_file(filename, mtime)
 
 
 class ContextualAssertionError(AssertionError):
@@ -177,19 +330,14 @@ class ContextualAssertionError(AssertionError):
     and/or describe what to do if/when the assertion fails. This string
     is formatted with the local context where the assertion error is
     raised.
-    '''
 
-    _META_FORMAT_STRING = '''{standardMsg}
+    The full failure message is built the first time the error is
+    converted to a string, so that failures that are expected (e.g.,
+    by :meth:`~unittest.TestCase.assertRaises`) don't pay for reading
+    the test's source. The error's ``args``, and so its :func:`repr`,
+    only hold :attr:`standardMsg`.
+    '''
 
-Source ({filename}):
-{assert_stmt}
-'''
-    _LOCALS_META_FORMAT_STRING = '''Locals:
-{locals}
-'''
-    _NOTE_META_FORMAT_STRING = '''Note:
-{note}
-'''
     # If msg and/or note are declared in the test's scope and passed
     # as variables to the assert statement, instead of being declared
     # directly in the assert statement, we don't want to display them
@@ -197,6 +345,11 @@ Source ({filename}):
     # and the note will be displayed elsewhere in the output anyway
     _IGNORE_LOCALS = ['msg', 'note', 'self']
 
+    _NOTE_WRAPPER = _NoteWrapper(width=72,
+                                 break_long_words=False,
+                                 initial_indent='\t',
+                                 subsequent_indent='\t')
+
     def __init__(self, *args):
         '''Assume args contains a tuple of two arguments:
             1. the "note" annotation provided by the test author, and
@@ -226,32 +379,46 @@ Source ({filename}):
         # When the wrapper in TestCase sees both msg and note, it
         # bundles msg with note in order to thread it down the stack.
         # So if the user was trying to override the standard message,
-        # their value would actually be here.
-        msg = annotation.pop('msg', None)
+        # their value would actually be here. The annotation may be a
+        # dict the user passed in and reuses, so we mustn't modify it.
+        msg = annotation.get('msg')
         if not msg:
             msg = standardMsg
 
-        setattr(self, '_note', annotation['note'])
-        setattr(self, 'standardMsg', msg)
-        setattr(self, '_locals', locals_)
-        setattr(self, '_module', module)
-        setattr(self, '_filename', filename)
-        setattr(self, '_linenumber', linenumber)
-
-        super(ContextualAssertionError, self).__init__(self.formattedMsg)
+        self._note = annotation['note']
+        self.standardMsg = msg
+        self._locals = locals_
+        self._module = module
+        # We need the module's globals to read its source if it isn't
+        # on disk, so we look them up now, while the module is surely
+        # still loaded
+        module = sys.modules.get(module)
+        self._module_globals = vars(module) if module is not None else None
+        self._filename = filename
+        self._linenumber = linenumber
+
+        # The note and the locals describe the state of the test when
+        # it failed, so we format them right away, before anything
+        # (e.g., tearDown) gets a chance to change the locals. Reading
+        # and parsing the source to find the assert statement can wait
+        # until someone actually asks for the message, which they
+        # won't if the failure is expected (e.g., by assertRaises).
+        self._formatted_note = self.note
+        self._formatted_locals = self._format_locals(self.public_test_locals)
+        self._formatted_msg = None
+
+        super(ContextualAssertionError, self).__init__(msg)
+
+    def __str__(self):
+        return self.formattedMsg
 
     @property
     def note(self):
         if self._note is None:
             return None
         else:
-            dedented_note = textwrap.dedent(self._note)
-            formatted_note = dedented_note.format(**self.locals)
-            wrapper = _NoteWrapper(width=72,
-                                   break_long_words=False,
-                                   initial_indent='\t',
-                                   subsequent_indent='\t')
-            return wrapper.fill(formatted_note)
+            formatted_note = _annotation.format_note(self._note, self.locals)
+            return self._NOTE_WRAPPER.fill(formatted_note)
 
     @property
     def locals(self):
@@ -300,12 +467,11 @@ Source ({filename}):
         # all check installation mechanisms we know of right now
         # (setup.py install, setup.py develop, pip install, bdist_egg,
         # bdist_wheel).
-        module_globals = vars(sys.modules[self.module])
+        source_file = _load_source(self.filename,
+                                   module_globals=self._module_globals)
         line_range, lineno = self._find_assert_stmt(
-            self.filename, self.linenumber, module_globals=module_globals)
-        source = [linecache.getline(self.filename, x,
-                                    module_globals=module_globals)
-                  for x in line_range]
+            self.filename, self.linenumber, source=source_file)
+        source = [source_file.getline(x) for x in line_range]
 
         # Dedent the source, removing the final newline added by dedent
         dedented_lines = textwrap.dedent(''.join(source)).split('\n')[:-1]
@@ -319,15 +485,22 @@ Source ({filename}):
 
     @property
     def formattedMsg(self):  # mimic unittest's name for standardMsg
-        fmt = self._META_FORMAT_STRING
-        if self.public_test_locals:
-            fmt += self._LOCALS_META_FORMAT_STRING
-        if self.note:
-            fmt += self._NOTE_META_FORMAT_STRING
-        local_string = self._format_locals(self.public_test_locals)
-        return fmt.format(
-            standardMsg=self.standardMsg, assert_stmt=self.assert_stmt,
-            note=self.note, locals=local_string, filename=self.filename)
+        if self._formatted_msg is None:
+            msg = f'{self.standardMsg}\n\n'
+            # This usually runs inside __str__, and the traceback module
+            # swallows anything raised there, along with the rest of
+            # the message. Not being able to show the source shouldn't
+            # keep us from showing everything else.
+            try:
+                msg += f'Source ({self.filename}):\n{self.assert_stmt}\n'
+            except Exception as e:
+                msg += f'Source ({self.filename}): unavailable ({e})\n'
+            if self._formatted_locals:
+                msg += f'Locals:\n{self._formatted_locals}\n'
+            if self._formatted_note:
+                msg += f'Note:\n{self._formatted_note}\n'
+            self._formatted_msg = msg
+        return self._formatted_msg
 
     @classmethod
     def _format_local(cls, name, value):
@@ -344,7 +517,7 @@ Source ({filename}):
 
     @staticmethod
     def _find_assert_stmt(filename, linenumber, leading=1, following=2,
-                          module_globals=None):
+                          module_globals=None, source=None):
         '''Given a Python module name, filename and line number, find
         the lines that are part of the statement containing that line.
 
@@ -362,16 +535,34 @@ Source ({filename}):
         :mod:`linecache` how to find the file, if it comes from inside
         an egg. In that case, ``module_globals`` should contain a key
         ``__loader__`` which knows how to read from that file.
-        '''
-        lines = linecache.getlines(
-            filename, module_globals=module_globals)
-        _source = ''.join(lines)
-        _tree = ast.parse(_source)
 
-        finder = _StatementFinder(linenumber)
-        finder.visit(_tree)
-        line_range = range(finder.found - leading, linenumber + following)
-        return line_range, finder.found
+        If the caller has already loaded the file with
+        :func:`_load_source`, it should pass it as ``source``, so that
+        the lines it shows come from the same version of the file as
+        the statement we find.
+        '''
+        if source is None:
+            source = _load_source(filename, module_globals=module_globals)
+        found = source.find_statement(linenumber)
+        if found is None:
+            # We couldn't tell which statement the line belongs to
+            # (e.g., the file changed since the test was loaded), so
+            # the best we can do is show the line itself.
+            found = linenumber
+        line_range = range(found - leading, linenumber + following)
+        return line_range, found
+
+
+def _is_mapping(obj):
+    '''Like ``isinstance(obj, collections.abc.Mapping)``, but checks
+    the types ``msg`` usually has first, because the ABC check is
+    comparatively slow and happens on every assertion.
+    '''
+    if obj is None or type(obj) is str:
+        return False
+    if type(obj) is dict:
+        return True
+    return isinstance(obj, collections.abc.Mapping)
 
 
 class AnnotationContext(object):
@@ -388,19 +579,20 @@ class AnnotationContext(object):
 
     def __init__(self, case, assertion, required_keys,
                  msg, note, args, kwargs):
-        setattr(self, '_case', case)
-        setattr(self, '_assertion', assertion)
-        setattr(self, '_required_keys', required_keys)
-        setattr(self, '_msg', msg)
-        setattr(self, '_note', note)
-        setattr(self, '_args', args)
-        setattr(self, '_kwargs', kwargs)
+        self._case = case
+        self._assertion = assertion
+        self._required_keys = required_keys
+        self._msg = msg
+        self._note = note
+        self._args = args
+        self._kwargs = kwargs
 
     def _validate_annotation(self, annotation):
         '''Ensures that the annotation has the right fields.'''
-        required_keys = set(self._required_keys)
-        keys = set(key for key, val in annotation.items() if val)
-        missing_keys = required_keys.difference(keys)
+        if not self._required_keys:
+            return
+        missing_keys = {key for key in self._required_keys
+                        if not annotation.get(key)}
         if missing_keys:
             error = 'Annotation missing required fields: {0}'.format(
                 missing_keys)
@@ -409,13 +601,13 @@ class AnnotationContext(object):
     def __enter__(self):
         current_note = getattr(self._case, '__current_note', None)
         note = self._note or current_note
-        if isinstance(self._msg, collections.abc.Mapping):
+        if _is_mapping(self._msg):
             annotation = self._msg
         else:
             annotation = {'msg': self._msg, 'note': note}
         if not current_note:
             self._validate_annotation(annotation)
-        setattr(self, '_old_note', current_note)
+        self._old_note = current_note
         setattr(self._case, '__current_note', note)
         return annotation
 
@@ -470,6 +662,18 @@ def _find_msg_argument(signature):
     return msg_idx, default_msg, non_msg_params
 
 
+def _method_signature(func):
+    '''Gets the signature of ``func`` as it will be called as a method,
+    that is, without its ``self`` parameter.
+    '''
+    signature = inspect.signature(func)
+    params = list(signature.parameters.values())
+    if params and params[0].kind in (inspect.Parameter.POSITIONAL_ONLY,
+                                     inspect.Parameter.POSITIONAL_OR_KEYWORD):
+        params = params[1:]
+    return signature.replace(parameters=params)
+
+
 def _extract_msg(args, kwargs, msg_idx, default_msg, non_msg_params):
     '''Extracts the ``msg`` argument from the passed ``args``.
 
@@ -516,6 +720,14 @@ class TestCase(unittest.TestCase):
     :meth:`str.format` given the local variables defined within the
     test itself.
 
+    Assertions are set up to accept ``note`` when a subclass is
+    defined, so an assertion added to a class after it's defined
+    (e.g., by assigning it, or with :func:`unittest.mock.patch.object`)
+    doesn't accept ``note``. Neither do the assertions of a subclass if
+    one of its bases defines :meth:`~object.__init_subclass__` without
+    calling ``super().__init_subclass__()``. Define custom assertions
+    in a class body or a mixin instead.
+
     Example:
 
     .. literalinclude:: examples/getting_started.py.annotated
@@ -524,32 +736,80 @@ class TestCase(unittest.TestCase):
 
     failureException = ContextualAssertionError
 
-    _REQUIRED_KEYS = []
+    _REQUIRED_KEYS = frozenset()
 
     def _formatMessage(self, msg, standardMsg):
         return (msg, standardMsg)
 
-    def __wrap_assertion(self, attr):
-        signature = inspect.signature(attr)
+    def __init_subclass__(cls, **kwargs):
+        '''Keyword argument support for assertions.
+
+        We want (Annotated)TestCases to be able to call assertions with
+        syntax like this:
+
+            self.assertTrue(True, msg='message', note='note')
+            self.assertTrue(True, 'message', note='note')
+
+        To do so, whenever a subclass is defined, we replace every
+        method it has that starts with 'assert' (whether it's defined
+        on the subclass, inherited, or mixed in), as well as ``fail``,
+        with a wrapper that does what we want. Doing this once per
+        class, rather than every time an assertion is looked up, keeps
+        attribute access on test cases as cheap as usual. A metaclass
+        could also catch assertions assigned to the class later, but it
+        would conflict with the metaclasses of mixins (e.g., the
+        :class:`abc.ABCMeta` of the mixins in :mod:`marbles.mixins`),
+        so those aren't wrapped, as the class docstring says.
+
+        To add other keyword arguments in the future, you have to make
+        sure that the way the underlying assertion gets called is
+        going to work with _formatMessage above, and the unpacking of
+        args in ContextualAssertionError.__init__, and you should watch
+        out for backwards compatibility with existing usage.
+        '''
+        super().__init_subclass__(**kwargs)
+        cls._wrap_assertions()
+
+    @classmethod
+    def _wrap_assertions(cls):
+        for name in dir(cls):
+            if name.startswith('assert'):
+                wrap = cls.__wrap_assertion
+            elif name == 'fail':
+                wrap = cls.__wrap_fail
+            else:
+                continue
+            func = inspect.getattr_static(cls, name)
+            # Assertions we've already wrapped on a base class don't
+            # need to be wrapped again
+            if (inspect.isfunction(func) and
+                    not getattr(func, '_marbles_wrapped', False)):
+                setattr(cls, name, wrap(func))
+
+    @staticmethod
+    def __wrap_assertion(func):
+        signature = _method_signature(func)
         msg_idx, default_msg, non_msg_params = _find_msg_argument(signature)
 
-        @functools.wraps(attr)
-        def wrapper(*args, **kwargs):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
             msg, args, rem_args, kwargs = _extract_msg(
                 args, kwargs, msg_idx, default_msg, non_msg_params)
 
             note = kwargs.pop('note', None)
 
             with AnnotationContext(
-                    self, attr, self._REQUIRED_KEYS, msg, note,
+                    self, func, self._REQUIRED_KEYS, msg, note,
                     list(args) + list(rem_args), kwargs) as annotation:
                 if rem_args:
-                    return attr(*args, annotation, *rem_args, **kwargs)
-                return attr(*args, msg=annotation, **kwargs)
+                    return func(self, *args, annotation, *rem_args, **kwargs)
+                return func(self, *args, msg=annotation, **kwargs)
+        wrapper._marbles_wrapped = True
         return wrapper
 
-    def __wrap_fail(self, attr):
-        signature = inspect.signature(attr)
+    @staticmethod
+    def __wrap_fail(func):
+        signature = _method_signature(func)
         msg_idx, default_msg, non_msg_params = _find_msg_argument(signature)
 
         # For TestCase.fail, we're not going to call _formatMessage,
@@ -558,8 +818,8 @@ class TestCase(unittest.TestCase):
         # extract msg and note as usual, but when we call the
         # wrapped function, we do what our _formatMessage would do and
         # pass the tuple directly.
-        @functools.wraps(attr)
-        def wrapper(*args, **kwargs):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
             msg, args, rem_args, kwargs = _extract_msg(
                 args, kwargs, msg_idx, default_msg, non_msg_params)
             # TestCase.fail doesn't have args after msg
@@ -571,47 +831,24 @@ class TestCase(unittest.TestCase):
             note = kwargs.pop('note', None)
 
             with AnnotationContext(
-                    self, attr, self._REQUIRED_KEYS, msg, note,
+                    self, func, self._REQUIRED_KEYS, msg, note,
                     list(args) + list(rem_args), kwargs) as annotation:
                 # Some builtin assertions (like assertIsNotNone)
                 # have already called _formatMessage and pass that
                 # to TestCase.fail, so if what we get is already a
                 # tuple, we just pass it along.
                 if isinstance(msg, tuple):
-                    return attr(*args, msg=msg, **kwargs)
+                    return func(self, *args, msg=msg, **kwargs)
                 packed_msg = self._formatMessage(annotation, msg)
-                return attr(*args, msg=packed_msg, **kwargs)
+                return func(self, *args, msg=packed_msg, **kwargs)
+        wrapper._marbles_wrapped = True
         return wrapper
 
-    def __getattribute__(self, key):
-        '''Keyword argument support for assertions.
-
-        We want (Annotated)TestCases to be able to call assertions with
-        syntax like this:
-
-            self.assertTrue(True, msg='message', note='note')
-            self.assertTrue(True, 'message', note='note')
-
-        To do so, we override __getattribute__ so that any method that
-        gets looked up and starts with 'assert' gets wrapped so that
-        it does what we want. We override __getattribute__ rather than
-        __getattr__ because __getattr__ doesn't get called when the
-        method just exists.
-
-        To add other keyword arguments in the future, you have to make
-        sure that the way the underlying assertion gets called is
-        going to work with _formatMessage above, and the unpacking of
-        args in ContextualAssertionError.__init__, and you should watch
-        out for backwards compatibility with existing usage.
-        '''
-        attr = object.__getattribute__(self, key)
-
-        if callable(attr) and key.startswith('assert'):
-            attr = self.__wrap_assertion(attr)
-        elif callable(attr) and key == 'fail':
-            attr = self.__wrap_fail(attr)
 
-        return attr
+# __init_subclass__ only runs for subclasses of TestCase, so we need
+# to wrap the assertions TestCase itself inherits from
+# unittest.TestCase explicitly.
+TestCase._wrap_assertions()
 
 
 class AnnotatedTestCase(TestCase):
@@ -627,4 +864,4 @@ class AnnotatedTestCase(TestCase):
     For other details, see :class:`marbles.core.TestCase`.
     '''
 
-    _REQUIRED_KEYS = ['note']
+    _REQUIRED_KEYS = frozenset(('note',))
@@ -35,6 +35,7 @@ import tempfile
 import unittest
 import unittest.util
 
+from marbles.core import AnnotationError
 from marbles.core import ContextualAssertionError
 from marbles.core import log
 from marbles.core import __version__
@@ -213,6 +214,25 @@ class TestAssertionLoggingVerboseTrue(LoggingConfigureTestCase):
         self.assertEqual({k: v for k, v in logs[0].items() if k in expected},
                          expected)
 
+    def test_note_undefined_local(self):
+        '''Do we explain which local a logged note refers to is missing?'''
+        with self.assertLogs('marbles.core.marbles', 'ERROR') as cm:
+            with self.assertRaises(AnnotationError):
+                self.case.test_note_format_strings_undefined_local()
+        # The last line of the logged traceback is the exception that
+        # stopped us from logging the assertion
+        self.assertTrue(cm.output[0].splitlines()[-1].endswith(
+            "AnnotationError: "
+            "Note refers to undefined local variable: 'answer'"))
+
+    def test_note_dedented(self):
+        '''Do we log notes dedented, as failure messages show them?'''
+        with self.assertRaises(ContextualAssertionError):
+            self.case.test_long_note()
+        logs = self.assertion_logs()
+        self.assertEqual(len(logs), 1)
+        self.assertIn('\nOnionskins - Although', logs[0]['note'])
+
 
 class TestAssertionLoggingVerboseFalse(LoggingConfigureTestCase):
 
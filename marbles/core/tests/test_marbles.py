@@ -27,13 +27,16 @@ check whether it responds by raising the right ContextualAssertionError
 with fields filled in.
 '''
 
+import ast
 import datetime
 import io
 import linecache
 import logging
 import os
 import sys
+import tempfile
 import unittest
+import unittest.mock
 
 from marbles.core import (
     AnnotatedTestCase,
@@ -42,6 +45,10 @@ from marbles.core import (
     TestCase
 )
 from marbles.core import log
+from marbles.core.marbles import (
+    _load_source,
+    _StatementIndex
+)
 
 
 class ReversingTestCaseMixin(object):
@@ -307,6 +314,14 @@ class ExampleTestCaseMixin(
         note = 'the date is {dt:%Y%m%d}'
         self.assertTrue(False, note=note)
 
+    def test_note_format_strings_undefined_local(self):
+        self.assertTrue(False, note='the answer is {answer}')
+
+    shared_annotation = {'msg': 'shared message', 'note': 'shared note'}
+
+    def test_shared_annotation_dict(self):
+        self.assertTrue(False, self.shared_annotation)
+
 
 @unittest.skip('This is the TestCase being tested')
 class ExampleTestCase(TestCase, ExampleTestCaseMixin):
@@ -440,6 +455,46 @@ class InterfaceTestCase(MarblesTestCase):
             with self.assertRaises(AssertionError):
                 self.case.test_missing_annotation_fail()
 
+    def test_assertions_wrapped_once(self):
+        '''Do subclasses reuse the assertions their bases wrapped?'''
+        cls = type(self.case)
+        subclass = type('SubTestCase', (cls,), {})
+        self.assertIs(subclass.assertEqual, TestCase.assertEqual)
+        self.assertIs(subclass.assertReverseEqual, cls.assertReverseEqual)
+        self.assertIsNot(cls.assertReverseEqual,
+                         ReversingTestCaseMixin.assertReverseEqual)
+
+    def test_assertion_assigned_later_not_wrapped(self):
+        '''Do assertions assigned after a class is defined take notes?
+
+        They don't, because we only wrap assertions when a class is
+        defined.
+        '''
+        def assertLater(self, expr, msg=None):
+            self.assertTrue(expr, msg=msg)
+
+        subclass = type('SubTestCase', (type(self.case),), {})
+        subclass.assertLater = assertLater
+        with self.assertRaisesRegex(TypeError, "'note'"):
+            subclass().assertLater(True, note='some note')
+
+    def test_assertions_not_wrapped_without_super_init_subclass(self):
+        '''Do assertions take notes if a mixin's __init_subclass__
+        doesn't call super()?
+
+        They don't, because that's where we wrap them.
+        '''
+        class Mixin(object):
+            def __init_subclass__(cls, **kwargs):
+                pass
+
+            def assertMixedIn(self, expr, msg=None):
+                self.assertTrue(expr, msg=msg)
+
+        subclass = type('SubTestCase', (Mixin, type(self.case)), {})
+        with self.assertRaisesRegex(TypeError, "'note'"):
+            subclass().assertMixedIn(True, note='some note')
+
 
 class TestAssertionLoggingFailure(MarblesTestCase):
 
@@ -527,7 +582,7 @@ class TestContextualAssertionError(MarblesTestCase):
         self.assertEqual(e.filename, os.path.abspath(__file__))
         # This isn't great because I have to change it every time I
         # add/remove imports but oh well
-        self.assertEqual(e.linenumber, 83)
+        self.assertEqual(e.linenumber, 90)
 
         with self.assertRaises(ContextualAssertionError) as ar:
             self.case.test_locals()
@@ -536,11 +591,11 @@ class TestContextualAssertionError(MarblesTestCase):
         self.assertEqual(e.filename, os.path.abspath(__file__))
         # This isn't great because I have to change it every time I
         # add/remove imports but oh well
-        self.assertEqual(e.linenumber, 211)
+        self.assertEqual(e.linenumber, 218)
 
     def test_assert_stmt_indicates_line(self):
         '''Does e.assert_stmt indicate the line from the source code?'''
-        test_linenumber = 83
+        test_linenumber = 90
         test_filename = os.path.abspath(__file__)
         with self.assertRaises(ContextualAssertionError) as ar:
             self.case.test_failure()
@@ -559,7 +614,7 @@ class TestContextualAssertionError(MarblesTestCase):
 
     def test_assert_stmt_surrounding_lines(self):
         '''Does _find_assert_stmt read surrounding lines from the file?'''
-        test_linenumber = 83
+        test_linenumber = 90
         test_filename = os.path.abspath(__file__)
         with self.assertRaises(ContextualAssertionError) as ar:
             self.case.test_failure()
@@ -740,6 +795,37 @@ class TestContextualAssertionError(MarblesTestCase):
         e = ar.exception
         self.assertEqual('the date is 20170812', e.note.strip())
 
+    def test_shared_annotation_dict(self):
+        '''Can the same annotation dict be used by several assertions?'''
+        for _ in range(2):
+            with self.assertRaises(ContextualAssertionError) as ar:
+                self.case.test_shared_annotation_dict()
+            e = ar.exception
+            self.assertEqual(e.standardMsg, 'shared message')
+            self.assertEqual(e.note.strip(), 'shared note')
+
+    def test_expected_failure_does_not_read_source(self):
+        '''Do we leave the source alone if nobody reads the message?'''
+        with unittest.mock.patch('marbles.core.marbles._load_source') as load:
+            with self.assertRaises(ContextualAssertionError):
+                self.case.test_failure()
+        load.assert_not_called()
+
+    def test_args_hold_standard_message(self):
+        '''Do the error's args and repr hold just the standard message?'''
+        with self.assertRaises(ContextualAssertionError) as ar:
+            self.case.test_failure()
+        e = ar.exception
+        self.assertEqual(e.args, (e.standardMsg,))
+        self.assertIn(repr(e.standardMsg), repr(e))
+        self.assertNotIn('Source', repr(e))
+        self.assertIn('Source', str(e))
+
+    def test_note_undefined_local(self):
+        '''Do we explain which local a note refers to is missing?'''
+        with self.assertRaisesRegex(AnnotationError, "'answer'"):
+            self.case.test_note_format_strings_undefined_local()
+
     def test_locals_hidden_when_missing(self):
         '''Does marbles hide the Locals section if there are none?'''
         with self.assertRaises(ContextualAssertionError) as ar:
@@ -762,6 +848,196 @@ class TestContextualAssertionError(MarblesTestCase):
         self.assertIn('Locals:', str(e))
 
 
+class TestSourceLookup(unittest.TestCase):
+    '''Tests for the helpers that find and read the failing statement.
+
+    These don't need an example test case, so unlike the tests above
+    they only run once.
+    '''
+
+    def _make_source_file(self, source=''):
+        fd, filename = tempfile.mkstemp(suffix='.py')
+        os.close(fd)
+        self.addCleanup(os.remove, filename)
+        with open(filename, 'w') as f:
+            f.write(source)
+        return filename
+
+    def _load_source_not_on_disk(self, source):
+        '''Loads ``source`` the way we'd load a module from inside an
+        egg, through its loader.
+        '''
+        class Loader(object):
+            def get_source(self, name):
+                return source
+
+        # linecache never rereads files it got from a loader, so each
+        # test needs its own filename
+        filename = '<{0}>.py'.format(self.id())
+        module_globals = {'__name__': 'not_on_disk', '__loader__': Loader()}
+        self.addCleanup(linecache.cache.pop, filename, None)
+        return _load_source(filename, module_globals=module_globals)
+
+    def test_assert_stmt_long_statement(self):
+        '''Does _find_assert_stmt find statements that start far above?'''
+        source = (['class FooTestCase(object):\n',
+                   '    def test_foo(self):\n',
+                   '        self.assertEqual(\n'] +
+                  ['            {0},\n'.format(i) for i in range(50)] +
+                  ['            None)\n'])
+        test_filename = self._make_source_file(''.join(source))
+        line_range, lineno = ContextualAssertionError._find_assert_stmt(
+            test_filename, 52)
+        self.assertEqual(lineno, 3)
+        self.assertEqual(line_range, range(2, 54))
+        # Reading the source through linecache, we should find the
+        # same statement
+        source = self._load_source_not_on_disk(''.join(source))
+        self.assertEqual(source.find_statement(52), 3)
+
+    def test_assert_stmt_long_literal(self):
+        '''Do we find the start of a literal whose items would parse on
+        their own?'''
+        source = (['x = [\n'] +
+                  ['    {0!r},\n'.format(i) for i in range(40)] +
+                  [']\n'])
+        source = self._load_source_not_on_disk(''.join(source))
+        self.assertEqual(source.find_statement(30), 1)
+        self.assertEqual(source.find_statement(42), 1)
+
+    def test_assert_stmt_lines_without_nodes(self):
+        '''Do lines that no node starts on belong to their statement?'''
+        source = self._load_source_not_on_disk('with foo:\n'
+                                               '    bar(\n'
+                                               '        1,\n'
+                                               '    )\n'
+                                               '\n'
+                                               'baz()\n')
+        self.assertEqual(source.find_statement(3), 2)
+        self.assertEqual(source.find_statement(4), 2)
+        self.assertEqual(source.find_statement(6), 6)
+
+    def test_source_unavailable(self):
+        '''Do we show the rest of the message if we can't read the
+        source?'''
+        source = ('class NotOnDiskTestCase(TestCase):\n'
+                  '    def test_failure(self):\n'
+                  '        foo = 1\n'
+                  '        self.assertTrue(False, note=\'foo is {foo}\')\n')
+        # Neither on disk nor in sys.modules, like a generated test
+        namespace = {'__name__': 'not_in_sys_modules', 'TestCase': TestCase}
+        exec(compile(source, '<not on disk>', 'exec'), namespace)
+        case = namespace['NotOnDiskTestCase']('test_failure')
+        with self.assertRaises(ContextualAssertionError) as ar:
+            case.test_failure()
+        message = str(ar.exception)
+        self.assertTrue(message.startswith('False is not true\n'))
+        self.assertIn('Source (<not on disk>): unavailable', message)
+        self.assertIn('foo = 1', message)
+        self.assertIn('foo is 1', message)
+
+    @staticmethod
+    def _index_without_end_lineno(source):
+        tree = ast.parse(source)
+        # Python 3.8 and later tell us where statements end, so hide
+        # that to check how we get by without it
+        for node in ast.walk(tree):
+            if getattr(node, 'end_lineno', None) is not None:
+                del node.end_lineno
+        return _StatementIndex(tree, source.splitlines(True))
+
+    def test_statement_index_without_end_lineno(self):
+        '''Do statements span their closing lines before Python 3.8?'''
+        index = self._index_without_end_lineno('with foo:\n'
+                                               '    bar(\n'
+                                               '        1,\n'
+                                               '    )\n'
+                                               'baz(\n'
+                                               ')\n')
+        self.assertEqual(index.find(3), 2)
+        self.assertEqual(index.find(4), 2)
+        self.assertEqual(index.find(6), 5)
+
+    def test_statement_index_clauses_without_end_lineno(self):
+        '''Do clause lines belong to their statement before Python 3.8?'''
+        index = self._index_without_end_lineno('try:\n'
+                                               '    foo(\n'
+                                               '    )\n'
+                                               'except ValueError:\n'
+                                               '    bar()\n'
+                                               '\n'
+                                               '# comment\n'
+                                               'else:\n'
+                                               '    if baz:\n'
+                                               '        pass\n'
+                                               '    elif qux:\n'
+                                               '        pass\n'
+                                               '    else:\n'
+                                               '        pass\n'
+                                               'finally:\n'
+                                               '    quux()\n')
+        self.assertEqual(index.find(3), 2)
+        self.assertEqual(index.find(4), 1)
+        self.assertEqual(index.find(6), 5)
+        self.assertEqual(index.find(8), 1)
+        self.assertEqual(index.find(10), 10)
+        self.assertEqual(index.find(11), 11)
+        self.assertEqual(index.find(13), 11)
+        self.assertEqual(index.find(15), 1)
+
+    def test_source_file_getline(self):
+        '''Does _SourceFile read the same lines as linecache?'''
+        test_filename = self._make_source_file()
+        sources = (b'foo()\nbar()\n',
+                   b'foo()\r\nbar()',
+                   b'# -*- coding: latin-1 -*-\nfoo = "\xe9"\n')
+        for mtime, source in enumerate(sources):
+            with open(test_filename, 'wb') as f:
+                f.write(source)
+            os.utime(test_filename, (mtime, mtime))
+            source_file = _load_source(test_filename)
+            for lineno in range(0, 5):
+                self.assertEqual(source_file.getline(lineno),
+                                 linecache.getline(test_filename, lineno))
+
+    def test_source_file_shares_linecache_lines(self):
+        '''Do we use linecache's lines rather than keep our own copy?'''
+        test_filename = self._make_source_file('foo()\n')
+        source_file = _load_source(test_filename)
+        self.assertIs(source_file.lines, linecache.getlines(test_filename))
+
+    def test_load_source_unreadable(self):
+        '''Do we raise OSError if we can't read the source at all?'''
+        with tempfile.TemporaryDirectory() as dirname:
+            with self.assertRaises(OSError):
+                _load_source(os.path.join(dirname, 'missing.py'))
+
+    def test_assert_stmt_reparses_modified_file(self):
+        '''Does _find_assert_stmt notice when the file changes?'''
+        test_filename = self._make_source_file('foo(\n    1)\n')
+        os.utime(test_filename, (0, 0))
+        lineno = ContextualAssertionError._find_assert_stmt(
+            test_filename, 2)[1]
+        self.assertEqual(lineno, 1)
+
+        with open(test_filename, 'w') as f:
+            f.write('foo()\nbar(1)\n')
+        os.utime(test_filename, (1, 1))
+        lineno = ContextualAssertionError._find_assert_stmt(
+            test_filename, 2)[1]
+        self.assertEqual(lineno, 2)
+
+    def test_assert_stmt_source_not_on_disk(self):
+        '''Can _find_assert_stmt read source through a module's loader?'''
+        source = self._load_source_not_on_disk('foo(\n    1)\nbar()\n')
+        self.assertEqual(source.getline(2), '    1)\n')
+        self.assertEqual(source.getline(4), '')
+        line_range, lineno = ContextualAssertionError._find_assert_stmt(
+            '<{0}>.py'.format(self.id()), 2, source=source)
+        self.assertEqual(lineno, 1)
+        self.assertEqual(line_range, range(0, 4))
+
+
 def load_tests(loader, tests, pattern):
     suite = unittest.TestSuite()
     module = sys.modules[__name__]
@@ -771,8 +1047,13 @@ def load_tests(loader, tests, pattern):
                         and issubclass(obj, unittest.TestCase)
                         and not getattr(obj, '__unittest_skip__', False))]
 
+    for cls in test_classes:
+        if not issubclass(cls, MarblesTestCase):
+            suite.addTests(loader.loadTestsFromTestCase(cls))
     for use_annotated_test_case in (True, False):
         for cls in test_classes:
+            if not issubclass(cls, MarblesTestCase):
+                continue
             for name in loader.getTestCaseNames(cls):
                 suite.addTest(
                     cls(